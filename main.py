@@ -1,30 +1,124 @@
 import asyncio
+import hashlib
+import multiprocessing
 import os
 import re
-from typing import Annotated, List, Optional
-
-import httpx
-from bs4 import BeautifulSoup
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from contextlib import asynccontextmanager
+from typing import Annotated, AsyncIterator, Dict, List, Optional, Set, Tuple
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+import aiohttp
+import ijson
+import orjson
+from cachetools import TTLCache
 from dotenv import load_dotenv
-from fastapi import FastAPI, Header, HTTPException
+from fastapi import FastAPI, Header, HTTPException, Request
+from fastapi.responses import ORJSONResponse, StreamingResponse
+from langchain_core.messages import BaseMessage, HumanMessage, SystemMessage
 from langchain_google_genai import ChatGoogleGenerativeAI
 from pydantic import BaseModel, Field
 
+from page_parser import parse_page
+
 load_dotenv()
 
 BRAVE_SEARCH_API_KEY = os.getenv("BRAVE_SEARCH_API_KEY")
 GEMINI_API_KEY = os.getenv("GEMINI_API_KEY")
 
+# Pages are read up to this many bytes; anything beyond is dropped unparsed.
+_MAX_PAGE_BYTES = 2 * 1024 * 1024
+# Ask for compressed HTML; aiohttp decodes br only when Brotli is installed.
+_PAGE_HEADERS = {"Accept-Encoding": "br, gzip"}
+# Query parameters that only track the click and never change the page.
+_TRACKING_PARAMS = frozenset(
+    {
+        "utm_source",
+        "utm_medium",
+        "utm_campaign",
+        "utm_term",
+        "utm_content",
+        "gclid",
+        "fbclid",
+    }
+)
+# Per-search cap on in-flight page fetches.
+_MAX_CONCURRENT_FETCHES = 8
+# Parsing a capped page takes milliseconds, so a few workers keep up with the
+# fetches without each core holding its own copy of the parser.
+_MAX_PARSER_WORKERS = 4
+# A parse that outlives this is abandoned and its worker killed, since the
+# fetch timeout stops at the download.
+_PARSE_TIMEOUT = 5.0
+
 
 model = ChatGoogleGenerativeAI(
     model="gemini-2.0-flash-lite",
     api_key=GEMINI_API_KEY,
+    response_mime_type="application/json",
+    max_output_tokens=8192,
+)
+
+# Search results shorter than this, or sharing no keyword with the query, are
+# dropped without a Gemini call. Shorter query words (and stopwords) match
+# almost any page, so they don't count as keywords.
+_MIN_PAGE_CHARS = 200
+_MIN_KEYWORD_CHARS = 3
+_STOPWORDS = frozenset(
+    {
+        "a",
+        "an",
+        "and",
+        "are",
+        "as",
+        "at",
+        "be",
+        "by",
+        "for",
+        "from",
+        "how",
+        "in",
+        "is",
+        "it",
+        "of",
+        "on",
+        "or",
+        "that",
+        "the",
+        "this",
+        "to",
+        "what",
+        "when",
+        "where",
+        "which",
+        "who",
+        "why",
+        "with",
+    }
 )
 
+# Roughly 8k tokens of page text per Gemini call, split evenly across the pages
+# in it; longer pages keep their head and tail.
+_MAX_PROMPT_CHARS = 32_000
+
+# Bounds concurrent Gemini calls across requests; a call that outlives the
+# timeout falls back to the raw page text. Pages are split into calls of at
+# most _PAGES_PER_CALL so the JSON reply fits in the output token limit.
+_GEMINI_SEM = asyncio.Semaphore(4)
+_GEMINI_TIMEOUT = 30.0
+_PAGES_PER_CALL = 4
+
+# Processed pages keyed by (url, query, search_context), so retried or repeated
+# searches skip both the fetch and the Gemini call.
+_PAGE_CACHE = TTLCache(maxsize=10_000, ttl=600)
 
-def get_prompt(text: str, query: str):
-    return f"""
-        You are a machine that takes in text of a webpage and
+
+# Kept as one module-level message so every Gemini call starts with the same
+# prefix, which lets Gemini's implicit context caching reuse it.
+_SYSTEM_MESSAGE = SystemMessage(
+    content="""
+        You are a machine that takes in text of one or more webpages and for each page
         if the search query is relevant to the page,
             returns a comprehensive yet focussed version of the page containing all the relevant information.
         if the search query is not relevant to the page,
@@ -34,19 +128,46 @@ def get_prompt(text: str, query: str):
         YOU MUST RETAIN URLS AS IT IS.
         YOU MUST BE CONCISE YET PRECISE.
         YOU MUST OUTPUT IN PROPERLY ANNOTATED MARKDOWN FORMAT.
+        YOU MUST RESPOND WITH A JSON LIST CONTAINING ONE {"page": ..., "markdown": ...}
+        OBJECT PER PAGE, WHERE "page" IS THE NUMBER i FROM THAT PAGE'S [[PAGE i URL=...]] HEADER.
+    """
+)
 
-        SEARCH QUERY:
-        {query}
+_PROMPT_TEMPLATE = "SEARCH QUERY:\n{query}\n\nWEBPAGES:\n{pages}"
 
-        WEBPAGE TEXT:
-        {text}
-    """
+
+def get_prompt(pages: List[tuple[str, str]], query: str) -> List[BaseMessage]:
+    page_blocks = "\n".join(
+        f"[[PAGE {i} URL={url}]]\n{text}" for i, (url, text) in enumerate(pages, 1)
+    )
+    return [
+        _SYSTEM_MESSAGE,
+        HumanMessage(content=_PROMPT_TEMPLATE.format(query=query, pages=page_blocks)),
+    ]
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    app.state.client = aiohttp.ClientSession(
+        # Separate caps so a host that is slow to resolve or connect fails
+        # fast instead of eating the whole budget.
+        timeout=aiohttp.ClientTimeout(
+            total=5, connect=2.5, sock_connect=1.5, sock_read=4.0
+        ),
+        connector=aiohttp.TCPConnector(limit=100, ttl_dns_cache=300),
+    )
+    app.state.parser_pool = ParserPool()
+    yield
+    await app.state.client.close()
+    app.state.parser_pool.shutdown()
 
 
 app = FastAPI(
     title="Web Search API",
     description="API for searching web pages using Brave Search API. returns raw text of the page.",
     version="0.1.0",
+    lifespan=lifespan,
+    default_response_class=ORJSONResponse,
 )
 
 
@@ -72,92 +193,289 @@ class SearchResponse(BaseModel):
     results: List[PageResult] = Field(..., description="List of search results")
 
 
-@app.post("/search", response_model=SearchResponse)
-async def search(
-    body: SearchRequest, x_brave_search_api_key: Annotated[str | None, Header()] = None
-):
-    async def fetch_url_content(
-        url: str, client: httpx.AsyncClient
-    ) -> Optional[PageResult]:
+def _cache_key(url: str, body: SearchRequest) -> bytes:
+    return hashlib.blake2b(
+        (url + "\0" + body.q + "\0" + body.search_context).encode(),
+        digest_size=16,
+    ).digest()
+
+
+def _normalize_url(url: str) -> str:
+    """Dedupe key for a URL: lowercase scheme/host, no fragment or tracking params, sorted query."""
+    parts = urlsplit(url)
+    query = urlencode(
+        sorted(
+            (key, value)
+            for key, value in parse_qsl(parts.query, keep_blank_values=True)
+            if key.lower() not in _TRACKING_PARAMS
+        )
+    )
+    return urlunsplit(
+        (parts.scheme.lower(), parts.netloc.lower(), parts.path, query, "")
+    )
+
+
+async def _aiter_urls(urls: List[str]) -> AsyncIterator[str]:
+    for url in urls:
+        yield url
+
+
+def _query_keywords(query: str) -> frozenset[str]:
+    return (
+        frozenset(
+            word
+            for word in re.findall(r"\w+", query.lower())
+            if len(word) >= _MIN_KEYWORD_CHARS
+        )
+        - _STOPWORDS
+    )
+
+
+def _worth_summarizing(text: str, keywords: frozenset[str]) -> bool:
+    """Cheap pre-filter so tiny or clearly off-topic pages skip Gemini."""
+    if len(text) < _MIN_PAGE_CHARS:
+        return False
+    if not keywords:
+        return True
+    text_lower = text.lower()
+    return any(keyword in text_lower for keyword in keywords)
+
+
+def _truncate_for_prompt(text: str, max_chars: int) -> str:
+    if len(text) <= max_chars:
+        return text
+    half = max_chars // 2
+    return text[:half] + "\n...\n" + text[-half:]
+
+
+async def _summarize_batch(pages: List[PageResult], query: str) -> Dict[str, str]:
+    """Summarize up to _PAGES_PER_CALL pages in one Gemini call; url -> markdown."""
+    max_chars = _MAX_PROMPT_CHARS // len(pages)
+    prompt = get_prompt(
+        [
+            (page.url, _truncate_for_prompt(page.page_contents, max_chars))
+            for page in pages
+        ],
+        query,
+    )
+    async with _GEMINI_SEM:
+        response = await asyncio.wait_for(
+            model.ainvoke(prompt), timeout=_GEMINI_TIMEOUT
+        )
+
+    # Results are matched on the [[PAGE i]] index rather than an echoed URL,
+    # which the model may rewrite.
+    summaries = {}
+    for item in orjson.loads(response.content):
+        if not isinstance(item, dict) or not item.get("markdown"):
+            continue
         try:
-            page_response = await client.get(url, timeout=5.0, follow_redirects=True)
-            page_response.raise_for_status()
+            index = int(item.get("page"))
+        except (TypeError, ValueError):
+            continue
+        if 1 <= index <= len(pages):
+            summaries[pages[index - 1].url] = item["markdown"]
+    return summaries
+
+
+async def summarize_pages(
+    pages: List[PageResult], query: str, prefilter: bool = True
+) -> Tuple[List[PageResult], Set[str]]:
+    """Rewrite pages with Gemini, a few per call, keeping raw text on failure.
+
+    With prefilter (Brave results only), pages that fail the pre-filter come
+    back with empty contents. Also returns the URLs whose result is final and
+    safe to cache; pages that fell back to raw text after a Gemini error are
+    left out so a retry summarizes them.
+    """
+    if not GEMINI_API_KEY or not pages:
+        return pages, {page.url for page in pages}
+
+    keywords = _query_keywords(query)
+    candidates = [
+        page
+        for page in pages
+        if not prefilter or _worth_summarizing(page.page_contents, keywords)
+    ]
+    contents = {page.url: page.page_contents for page in candidates}
+    settled = {page.url for page in pages} - contents.keys()
+
+    if candidates:
+        print(f"Processing {len(candidates)} pages with query: {query}")
+        batches = [
+            candidates[i : i + _PAGES_PER_CALL]
+            for i in range(0, len(candidates), _PAGES_PER_CALL)
+        ]
+        results = await asyncio.gather(
+            *(_summarize_batch(batch, query) for batch in batches),
+            return_exceptions=True,
+        )
+        summarized = 0
+        for result in results:
+            if isinstance(result, TimeoutError):
+                print("WARNING: Gemini timed out, using raw text")
+            elif isinstance(result, BaseException):
+                print(f"WARNING: Error processing with Gemini: {result}")
+            else:
+                contents.update(result)
+                settled.update(result)
+                summarized += len(result)
+        print(f"Processing complete for {summarized} of {len(candidates)} pages")
+
+    return [
+        page.model_copy(update={"page_contents": contents.get(page.url, "")})
+        for page in pages
+    ], settled
+
+
+class ParserPool:
+    """Process pool for parse_page that replaces itself if a worker dies.
+
+    Workers start via forkserver rather than forking the running, threaded
+    event loop process. The forkserver preloads page_parser, so new workers
+    (including those of a replacement pool) fork with the parser already
+    imported instead of re-importing the app.
+    """
 
-            soup = BeautifulSoup(page_response.text, "html.parser")
-
-            page_title = ""
-            title_tag = soup.find("title")
-            if title_tag and title_tag.string:
-                page_title = title_tag.string.strip()
-
-            for a_tag in soup.find_all("a", href=True):
-                href = a_tag["href"]
-
-                if href.startswith("/"):
-                    if href.startswith("//"):
-                        href = "https:" + href
-                    else:
-                        base_url = "/".join(url.split("/")[:3])
-                        href = base_url + href
-
-                link_text = a_tag.get_text(strip=True)
-                if not link_text:
-                    link_text = "Link"
-
-                cleaned_href = re.sub(r"^https?://", "", href)
-                a_tag.string = f"{link_text} ({cleaned_href})"
-
-            for tag in soup(
-                [
-                    "meta",
-                    "footer",
-                    "nav",
-                    "script",
-                    "style",
-                    "button",
-                    "form",
-                ]
-            ):
-                tag.extract()
-
-            for stylesheet in soup.find_all("link", rel="stylesheet"):
-                stylesheet.extract()
-
-            text = soup.get_text(separator="\n", strip=True)
-
-            if GEMINI_API_KEY:
-                try:
-                    print(f"Processing {url} with query: {body.search_context}")
-                    prompt = get_prompt(text, body.q + "\n" + body.search_context)
-                    response = await model.ainvoke(prompt)
-                    processed_text = response.content
-                    if processed_text:
-                        text = processed_text
-                    print(f"Processing complete for {url}")
-                except Exception as e:
-                    print(f"WARNING: Error processing with Gemini: {e}")
-
-            return PageResult(url=url, page_title=page_title, page_contents=text)
-        except Exception as e:
-            print(f"WARNING: Error fetching {url}: {e}")
-            return None
+    def __init__(self) -> None:
+        self._executor = self._new_executor()
+        # Parses wait here rather than in the executor's queue, so the deadline
+        # only counts time spent on a worker.
+        self._slots = asyncio.Semaphore(self._max_workers())
+
+    @staticmethod
+    def _max_workers() -> int:
+        return min(os.cpu_count() or 1, _MAX_PARSER_WORKERS)
+
+    @classmethod
+    def _new_executor(cls) -> ProcessPoolExecutor:
+        mp_context = multiprocessing.get_context("forkserver")
+        mp_context.set_forkserver_preload(["page_parser"])
+        return ProcessPoolExecutor(
+            max_workers=cls._max_workers(), mp_context=mp_context
+        )
 
-    if body.url:
-        async with httpx.AsyncClient() as client:
+    def _replace(self, old: ProcessPoolExecutor) -> None:
+        # Several in-flight parses see the same breakage; only swap once.
+        if self._executor is old:
+            print("WARNING: Restarting the parser pool")
+            # Cancelling a future does not stop a worker already running it,
+            # so the old workers are killed outright (terminate_workers() is
+            # only available from Python 3.14).
+            for process in list((old._processes or {}).values()):
+                process.kill()
+            old.shutdown(wait=False, cancel_futures=True)
+            self._executor = self._new_executor()
+
+    async def _run(self, page_text: str, url: str) -> Tuple[str, str]:
+        loop = asyncio.get_running_loop()
+        executor = self._executor
+        try:
+            return await asyncio.wait_for(
+                loop.run_in_executor(executor, parse_page, page_text, url),
+                timeout=_PARSE_TIMEOUT,
+            )
+        except TimeoutError:
+            print(f"WARNING: Parsing {url} timed out")
+            self._replace(executor)
+            raise
+        except BrokenProcessPool:
+            self._replace(executor)
+            raise
+
+    async def parse(self, page_text: str, url: str) -> Tuple[str, str]:
+        async with self._slots:
             try:
-                result = await fetch_url_content(body.url, client)
-                if result:
-                    return SearchResponse(results=[result])
-                else:
-                    raise HTTPException(
-                        status_code=404,
-                        detail=f"Unable to fetch content from URL: {body.url}",
-                    )
-            except Exception as e:
-                raise HTTPException(
-                    status_code=500, detail=f"Error fetching URL: {str(e)}"
+                return await self._run(page_text, url)
+            except BrokenProcessPool:
+                pass
+            # Retry once on the fresh pool, which also covers pages caught up
+            # in another page's timeout; if this page kills a worker again it
+            # is dropped, and the pool is replaced for everyone else.
+            return await self._run(page_text, url)
+
+    def shutdown(self) -> None:
+        self._executor.shutdown()
+
+
+async def fetch_url_content(
+    url: str, client: aiohttp.ClientSession, parser_pool: ParserPool
+) -> Optional[PageResult]:
+    try:
+        async with client.get(
+            url, headers=_PAGE_HEADERS, allow_redirects=True
+        ) as page_response:
+            page_response.raise_for_status()
+            page_bytes = bytearray()
+            async for chunk in page_response.content.iter_chunked(65536):
+                page_bytes += chunk
+                if len(page_bytes) > _MAX_PAGE_BYTES:
+                    break
+            # Trust the declared charset rather than sniffing the bytes; an
+            # unknown label or a non-text codec (base64, zlib, ...) falls back
+            # to utf-8 instead of failing.
+            try:
+                page_text = page_bytes[:_MAX_PAGE_BYTES].decode(
+                    page_response.charset or "utf-8", errors="replace"
+                )
+            except LookupError:
+                page_text = page_bytes[:_MAX_PAGE_BYTES].decode(
+                    "utf-8", errors="replace"
                 )
 
+        # Parsing is CPU-bound, so it runs in worker processes to keep the
+        # event loop free for other requests' I/O.
+        page_title, text = await parser_pool.parse(page_text, url)
+
+        return PageResult(url=url, page_title=page_title, page_contents=text)
+    except Exception as e:
+        print(f"WARNING: Error fetching {url}: {e}")
+        return None
+
+
+async def brave_urls(
+    client: aiohttp.ClientSession, brave_api_key: str, body: SearchRequest
+) -> AsyncIterator[str]:
+    brave_search_url = "https://api.search.brave.com/res/v1/web/search"
+    headers = {
+        "Accept": "application/json",
+        "X-Subscription-Token": brave_api_key,
+    }
+    params = {
+        "q": body.q,
+        "count": body.n,
+    }
+
+    async with client.get(
+        brave_search_url, headers=headers, params=params
+    ) as search_response:
+        if search_response.status >= 400:
+            raise HTTPException(
+                status_code=search_response.status,
+                detail=f"Error from Brave Search API: {await search_response.text()}",
+            )
+        # Brave often returns the same page under different tracking params or
+        # fragments; yield the first original URL for each normalized form, in
+        # ranking order. The normalized string is only a dedupe key, since
+        # re-encoding the query is not lossless.
+        seen = set()
+        async for url in ijson.items_async(
+            search_response.content, "web.results.item.url"
+        ):
+            dedupe_key = _normalize_url(url)
+            if dedupe_key in seen:
+                continue
+            seen.add(dedupe_key)
+            yield url
+            if len(seen) >= body.n:
+                break
+
+
+def page_urls(
+    body: SearchRequest,
+    x_brave_search_api_key: Optional[str],
+    client: aiohttp.ClientSession,
+) -> AsyncIterator[str]:
     if not body.q:
         raise HTTPException(
             status_code=400, detail="Either 'url' or 'q' parameter must be provided"
@@ -171,51 +489,194 @@ async def search(
             detail="Brave Search API key is needed.X-Brave-Search-API-Key header.",
         )
 
-    async with httpx.AsyncClient() as client:
+    return brave_urls(client, brave_api_key, body)
+
+
+async def schedule_pages(
+    urls: AsyncIterator[str],
+    body: SearchRequest,
+    client: aiohttp.ClientSession,
+    parser_pool: ParserPool,
+) -> List[Tuple[bytes, PageResult | asyncio.Task]]:
+    """Pair each URL's cache key with its cached page or a running fetch task."""
+    # Each fetch is scheduled as soon as its URL arrives, so page downloads
+    # overlap with the rest of the Brave response still being read.
+    fetch_sem = asyncio.Semaphore(_MAX_CONCURRENT_FETCHES)
+
+    async def bounded_fetch(url: str) -> Optional[PageResult]:
+        async with fetch_sem:
+            return await fetch_url_content(url, client, parser_pool)
+
+    pending = []
+    try:
+        async for url in urls:
+            key = _cache_key(url, body)
+            if key in _PAGE_CACHE:
+                pending.append((key, _PAGE_CACHE[key]))
+            else:
+                pending.append((key, asyncio.create_task(bounded_fetch(url))))
+    except BaseException:
+        for _, page in pending:
+            if isinstance(page, asyncio.Task):
+                page.cancel()
+        raise
+
+    return pending
+
+
+async def collect_pages(
+    pending: List[Tuple[bytes, PageResult | asyncio.Task]], body: SearchRequest
+) -> List[PageResult]:
+    """Wait for every fetch, then summarize the new pages in one Gemini call."""
+    pages_by_key = {key: page for key, page in pending if isinstance(page, PageResult)}
+    tasks = [page for _, page in pending if isinstance(page, asyncio.Task)]
+    results_with_none = await asyncio.gather(*tasks, return_exceptions=True)
+
+    pages = [
+        result
+        for result in results_with_none
+        if isinstance(result, PageResult) and result.page_contents.strip()
+    ]
+
+    pages, settled = await summarize_pages(
+        pages, body.q + "\n" + body.search_context, prefilter=not body.url
+    )
+    for page in pages:
+        key = _cache_key(page.url, body)
+        pages_by_key[key] = page
+        if page.url in settled:
+            _PAGE_CACHE[key] = page
+
+    return [
+        pages_by_key[key]
+        for key, _ in pending
+        if key in pages_by_key and pages_by_key[key].page_contents.strip()
+    ]
+
+
+async def stream_pages(
+    pending: List[Tuple[bytes, PageResult | asyncio.Task]], body: SearchRequest
+) -> AsyncIterator[str]:
+    """Yield each page as an NDJSON line as soon as it is fetched and summarized."""
+
+    async def finish_page(task: asyncio.Task) -> Optional[PageResult]:
+        page = await task
+        if page is None or not page.page_contents.strip():
+            return None
+        (page,), settled = await summarize_pages(
+            [page], body.q + "\n" + body.search_context, prefilter=not body.url
+        )
+        if page.url in settled:
+            _PAGE_CACHE[_cache_key(page.url, body)] = page
+        return page
+
+    tasks = []
+    for _, page in pending:
+        if isinstance(page, asyncio.Task):
+            tasks.append(asyncio.create_task(finish_page(page)))
+        elif page.page_contents.strip():
+            yield page.model_dump_json() + "\n"
+
+    try:
+        for next_page in asyncio.as_completed(tasks):
+            try:
+                page = await next_page
+            except Exception as e:
+                print(f"WARNING: Error finishing page: {e}")
+                continue
+            if page is not None and page.page_contents.strip():
+                yield page.model_dump_json() + "\n"
+    finally:
+        # Stops outstanding fetches if the client disconnects mid-stream.
+        for _, page in pending:
+            if isinstance(page, asyncio.Task):
+                page.cancel()
+        for task in tasks:
+            task.cancel()
+
+
+@app.post("/search")
+async def search(
+    request: Request,
+    body: SearchRequest,
+    x_brave_search_api_key: Annotated[str | None, Header()] = None,
+):
+    """Stream results as newline-delimited PageResult JSON as each page completes."""
+    client: aiohttp.ClientSession = request.app.state.client
+    parser_pool: ParserPool = request.app.state.parser_pool
+
+    if body.url:
+        # A single direct URL is fetched before streaming starts so a failed
+        # fetch is still reported as a 404 rather than an empty stream.
         try:
-            brave_search_url = "https://api.search.brave.com/res/v1/web/search"
-            headers = {
-                "Accept": "application/json",
-                "X-Subscription-Token": brave_api_key,
-            }
-            params = {
-                "q": body.q,
-                "count": body.n,
-            }
-
-            search_response = await client.get(
-                brave_search_url, headers=headers, params=params
+            pending = await schedule_pages(
+                _aiter_urls([body.url]), body, client, parser_pool
             )
-            search_response.raise_for_status()
-            search_results = search_response.json()
+            results = await collect_pages(pending, body)
+        except Exception as e:
+            raise HTTPException(
+                status_code=500, detail=f"Error fetching URL: {str(e)}"
+            )
+        if not results:
+            raise HTTPException(
+                status_code=404,
+                detail=f"Unable to fetch content from URL: {body.url}",
+            )
+        pending = [(_cache_key(page.url, body), page) for page in results]
+        return StreamingResponse(
+            stream_pages(pending, body), media_type="application/x-ndjson"
+        )
 
-            urls = []
-            if "web" in search_results and "results" in search_results["web"]:
-                urls = [
-                    result["url"]
-                    for result in search_results["web"]["results"][: body.n]
-                ]
+    urls = page_urls(body, x_brave_search_api_key, client)
 
-            if not urls:
-                return SearchResponse(results=[])
+    try:
+        pending = await schedule_pages(urls, body, client, parser_pool)
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(
+            status_code=500, detail=f"Error during search: {str(e)}"
+        )
 
-            tasks = [fetch_url_content(url, client) for url in urls]
-            results_with_none = await asyncio.gather(*tasks)
+    return StreamingResponse(
+        stream_pages(pending, body), media_type="application/x-ndjson"
+    )
 
-            results = [
-                result
-                for result in results_with_none
-                if result is not None and result.page_contents.strip()
-            ]
 
-            return SearchResponse(results=results)
+@app.post("/search_batch", response_model=SearchResponse)
+async def search_batch(
+    request: Request,
+    body: SearchRequest,
+    x_brave_search_api_key: Annotated[str | None, Header()] = None,
+):
+    client: aiohttp.ClientSession = request.app.state.client
+    parser_pool: ParserPool = request.app.state.parser_pool
 
-        except httpx.HTTPStatusError as e:
-            raise HTTPException(
-                status_code=e.response.status_code,
-                detail=f"Error from Brave Search API: {e.response.text}",
+    if body.url:
+        try:
+            pending = await schedule_pages(
+                _aiter_urls([body.url]), body, client, parser_pool
             )
+            results = await collect_pages(pending, body)
         except Exception as e:
             raise HTTPException(
-                status_code=500, detail=f"Error during search: {str(e)}"
+                status_code=500, detail=f"Error fetching URL: {str(e)}"
+            )
+        if not results:
+            raise HTTPException(
+                status_code=404,
+                detail=f"Unable to fetch content from URL: {body.url}",
             )
+        return SearchResponse(results=results)
+
+    urls = page_urls(body, x_brave_search_api_key, client)
+
+    try:
+        pending = await schedule_pages(urls, body, client, parser_pool)
+        return SearchResponse(results=await collect_pages(pending, body))
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(
+            status_code=500, detail=f"Error during search: {str(e)}"
+        )
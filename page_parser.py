@@ -0,0 +1,84 @@
+"""Page parsing that runs in the parser pool's worker processes.
+
+Kept apart from main.py so workers only import the parser dependencies, not
+FastAPI, dotenv or the Gemini client.
+"""
+
+import re
+from typing import Tuple
+from urllib.parse import urljoin
+
+from selectolax.lexbor import LexborHTMLParser
+
+# <script>/<style> bodies are raw text that ends at the first closing tag, so
+# they can be cut out before parsing instead of being built and then stripped.
+# The lookahead keeps custom elements such as <script-foo> out.
+_RAW_TEXT_OPEN_RE = re.compile(r"<(script|style)(?=[\s/>])", re.IGNORECASE)
+_RAW_TEXT_CLOSE_RES = {
+    "script": re.compile(r"</script\s*>", re.IGNORECASE),
+    "style": re.compile(r"</style\s*>", re.IGNORECASE),
+}
+_SCHEME_RE = re.compile(r"^https?://")
+_STRIP_TAGS = [
+    "meta",
+    "footer",
+    "nav",
+    "script",
+    "style",
+    "button",
+    "form",
+    "link",
+]
+
+
+def _strip_raw_text(page_text: str) -> str:
+    """Cut out <script>/<style> elements in one forward scan."""
+    parts = []
+    pos = 0
+    while opener := _RAW_TEXT_OPEN_RE.search(page_text, pos):
+        closer = _RAW_TEXT_CLOSE_RES[opener.group(1).lower()].search(
+            page_text, opener.end()
+        )
+        if not closer:
+            # An unclosed element runs to the end of the page anyway; leave it
+            # to the parser rather than rescanning the rest for every opener.
+            break
+        parts.append(page_text[pos : opener.start()])
+        pos = closer.end()
+    parts.append(page_text[pos:])
+    return "".join(parts)
+
+
+def parse_page(page_text: str, url: str) -> Tuple[str, str]:
+    """Return the title and cleaned text of a page."""
+    tree = LexborHTMLParser(_strip_raw_text(page_text))
+
+    page_title = ""
+    title_tag = tree.css_first("title")
+    if title_tag:
+        page_title = title_tag.text(strip=True)
+
+    tree.strip_tags(_STRIP_TAGS)
+
+    # Links are rewritten on the parsed tree, which is linear in the page size
+    # however badly its anchors are nested or closed.
+    for anchor in tree.css("a[href]"):
+        raw_href = anchor.attributes.get("href") or ""
+        try:
+            href = urljoin(url, raw_href)
+        except ValueError:
+            # Malformed hrefs (e.g. an unclosed IPv6 host) are kept as written.
+            href = raw_href
+
+        link_text = anchor.text().strip()
+        if not link_text:
+            link_text = "Link"
+
+        anchor.replace_with(f"{link_text} ({_SCHEME_RE.sub('', href)})")
+    # Fold each rewritten link back into the surrounding text so it is not
+    # split onto its own line.
+    tree.merge_text_nodes()
+
+    text = tree.root.text(separator="\n", strip=True) if tree.root else ""
+
+    return page_title, text
@@ -32,25 +32,30 @@ async def test_search_api():
     # Make the request
     async with httpx.AsyncClient() as client:
         try:
-            response = await client.post(url, json=data, headers=headers)
-            response.raise_for_status()
-            
-            # Parse and display results
-            results = response.json()
-            
-            print("\nSearch Results:")
-            print("==============")
-            
-            for i, result in enumerate(results.get("results", [])):
-                print(f"\nResult {i+1}")
-                print(f"URL: {result.get('url')}")
+            async with client.stream("POST", url, json=data, headers=headers) as response:
+                if response.is_error:
+                    await response.aread()
+                response.raise_for_status()
                 
-                # Truncate page contents for display
-                content = result.get("page_contents", "")
-                truncated_content = content[:500] + "..." if len(content) > 500 else content
-                print(f"Content (truncated): {truncated_content}")
+                # Results arrive as one JSON object per line, as each page completes
+                print("\nSearch Results:")
+                print("==============")
                 
-            print(f"\nTotal results: {len(results.get('results', []))}")
+                count = 0
+                async for line in response.aiter_lines():
+                    if not line.strip():
+                        continue
+                    result = json.loads(line)
+                    count += 1
+                    print(f"\nResult {count}")
+                    print(f"URL: {result.get('url')}")
+                    
+                    # Truncate page contents for display
+                    content = result.get("page_contents", "")
+                    truncated_content = content[:500] + "..." if len(content) > 500 else content
+                    print(f"Content (truncated): {truncated_content}")
+                    
+                print(f"\nTotal results: {count}")
             
         except httpx.HTTPStatusError as e:
             print(f"Error: HTTP {e.response.status_code} - {e.response.text}")
@@ -0,0 +1,127 @@
+import asyncio
+import os
+import time
+from types import SimpleNamespace
+
+os.environ.setdefault("GEMINI_API_KEY", "test")
+
+import main
+from main import (
+    PageResult,
+    _normalize_url,
+    _query_keywords,
+    _summarize_batch,
+    _truncate_for_prompt,
+    _worth_summarizing,
+)
+from page_parser import parse_page
+
+
+def test_parse_page_ignores_data_href():
+    _, text = parse_page(
+        '<p><a data-href="x" href="/real">T</a></p>', "https://ex.com/a/"
+    )
+    assert "T (ex.com/real)" in text
+
+
+def test_parse_page_keeps_unquoted_href():
+    _, text = parse_page("<p><a href=/unq>U</a></p>", "https://ex.com/a/")
+    assert "U (ex.com/unq)" in text
+
+
+def test_parse_page_keeps_malformed_href():
+    _, text = parse_page('<p><a href="http://[bad/">B</a></p>', "https://ex.com/a/")
+    assert "B ([bad/)" in text
+
+
+def test_parse_page_strips_script_but_not_custom_elements():
+    _, text = parse_page(
+        "<p>a</p><script>x()</script><script-foo>keep</script-foo><p>b</p>"
+        "<style>p {}</style><script>y()</script>",
+        "https://ex.com/",
+    )
+    assert text.split("\n") == ["a", "keep", "b"]
+
+
+def test_parse_page_unclosed_scripts_stay_linear():
+    start = time.perf_counter()
+    _, text = parse_page("<p>ok</p>" + "<script>x " * 20_000, "https://ex.com/")
+    assert time.perf_counter() - start < 2
+    assert text == "ok"
+
+
+def test_parse_page_unclosed_anchors_stay_linear():
+    start = time.perf_counter()
+    _, text = parse_page("<p>" + '<a href="x">t ' * 5_000 + "</p>", "https://ex.com/")
+    assert time.perf_counter() - start < 2
+    assert text.count("(ex.com/x)") == 5_000
+
+
+def test_normalize_url_drops_tracking_params_and_fragment():
+    assert (
+        _normalize_url("HTTPS://Ex.COM/Path?utm_source=x&b=2&a=1&gclid=y#top")
+        == "https://ex.com/Path?a=1&b=2"
+    )
+
+
+def test_normalize_url_keeps_path_case_and_blank_values():
+    assert _normalize_url("http://ex.com/A/b?q=&x=1") == "http://ex.com/A/b?q=&x=1"
+
+
+def test_query_keywords_drops_stopwords_and_short_words():
+    assert _query_keywords("What is AI in 2024 GPUs?") == {"2024", "gpus"}
+
+
+def test_worth_summarizing():
+    keywords = _query_keywords("rust borrow checker")
+    assert not _worth_summarizing("Rust " * 10, keywords)
+    assert _worth_summarizing("x " * 100 + "The Borrow checker", keywords)
+    assert not _worth_summarizing("x " * 100 + "gardening", keywords)
+    assert _worth_summarizing("x " * 100, frozenset())
+
+
+def test_truncate_for_prompt_keeps_short_text():
+    assert _truncate_for_prompt("abc", 3) == "abc"
+
+
+def test_truncate_for_prompt_keeps_head_and_tail():
+    assert _truncate_for_prompt("0123456789", 4) == "01\n...\n89"
+
+
+def _fake_model(monkeypatch, content: str) -> list:
+    """Swap the Gemini client for one that records prompts and returns content."""
+    prompts = []
+
+    async def ainvoke(prompt):
+        prompts.append(prompt)
+        return SimpleNamespace(content=content)
+
+    monkeypatch.setattr(main, "model", SimpleNamespace(ainvoke=ainvoke))
+    return prompts
+
+
+def test_summarize_batch_splits_prompt_budget_across_pages(monkeypatch):
+    prompts = _fake_model(monkeypatch, "[]")
+    pages = [
+        PageResult(url=f"https://ex.com/{i}", page_contents="x" * 100_000)
+        for i in range(4)
+    ]
+    asyncio.run(_summarize_batch(pages, "q"))
+    (prompt,) = prompts
+    assert len(prompt[1].content) < main._MAX_PROMPT_CHARS + 200
+
+
+def test_summarize_batch_maps_results_by_page_index(monkeypatch):
+    _fake_model(
+        monkeypatch,
+        '[{"page": 2, "markdown": "two"}, {"page": "1", "markdown": "one"},'
+        ' {"page": 0, "markdown": "low"}, {"page": 3, "markdown": "high"},'
+        ' {"page": "x", "markdown": "bad"}, {"page": null, "markdown": "none"},'
+        ' {"page": 2, "markdown": ""}, "junk"]',
+    )
+    pages = [
+        PageResult(url="https://ex.com/a", page_contents="a"),
+        PageResult(url="https://ex.com/b", page_contents="b"),
+    ]
+    summaries = asyncio.run(_summarize_batch(pages, "q"))
+    assert summaries == {"https://ex.com/a": "one", "https://ex.com/b": "two"}